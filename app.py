@@ -1,8 +1,6 @@
-import os
 import json
 import csv
 import io
-import tempfile
 import base64
 import matplotlib.pyplot as plt
 import streamlit as st
@@ -10,6 +8,14 @@ from PIL import Image
 import pandas as pd
 import streamlit.components.v1 as components
 from src.pipeline import process_resume
+from src.archive import (
+    ARCHIVE_ERRORS,
+    ARCHIVE_SUFFIXES,
+    check_pdf,
+    is_archive,
+    iter_archive_pdfs,
+    read_archive_member,
+)
 import time
 import plotly.graph_objects as go
 # ─── Page Config ───────────────────────────────────────────────────────────────
@@ -26,7 +32,7 @@ st.markdown("""
 # ─── Header ────────────────────────────────────────────────────────────────────
 logo = Image.open("assets/logo.png")
 st.image(logo, width=350, )
-st.markdown("Upload PDF resumes and press **Process Resumes** to begin.")
+st.markdown("Upload PDF resumes (or a ZIP/tar of them) and press **Process Resumes** to begin.")
 
 # ─── Centered Uploader & Process Button ────────────────────────────────────────
 col1, col2, col3 = st.columns([1, 2, 1])
@@ -41,8 +47,8 @@ with col2:
     jd_file = st.file_uploader("Upload Job Description (.txt)", type="txt", key="jd_uploader")
 
     uploaded_files = st.file_uploader(
-        "Drop PDF resumes here",
-        type="pdf",
+        "Drop PDF resumes or ZIP/tar archives here",
+        type=["pdf"] + sorted({sfx.rsplit(".", 1)[-1] for sfx in ARCHIVE_SUFFIXES}),
         accept_multiple_files=True,
         key="center_uploader"
     )
@@ -55,21 +61,40 @@ company_skills = [s.strip().lower() for s in required_skills.split(",") if s.str
 if process and uploaded_files:
     with st.spinner("Parsing resumes, please wait…"):
         results = []
-        for pdf in uploaded_files:
-            # write to temp file for pipeline
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-                tmp.write(pdf.getbuffer())
-                tmp_path = tmp.name
-            jd_path = None
-            if jd_file:
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".txt") as jd_tmp:
-                    jd_tmp.write(jd_file.getbuffer())
-                    jd_path = jd_tmp.name
-            res = process_resume(tmp_path, jd_path=jd_path, company_skills=company_skills)
-            res["_pdf_buffer"] = pdf.getbuffer()  # keep in memory
-            res["file_name"] = pdf.name  # ✅ Store original filename
+        jd_text = jd_file.getvalue().decode("utf-8", errors="replace") if jd_file else ""
+
+        def iter_uploads():
+            # archives are read member by member, straight into memory;
+            # yields (name, pdf bytes, upload, archive member name or None)
+            for up in uploaded_files:
+                if not is_archive(up.name):
+                    data = up.getvalue()
+                    if data.startswith(b"%PDF"):
+                        yield up.name, data, up, None
+                    else:
+                        st.warning(f"Skipped {up.name}: not a PDF")
+                    continue
+                try:
+                    for member, data, err in iter_archive_pdfs(up):
+                        label = f"{up.name}/{member}"  # same label as pipeline.iter_resumes
+                        err = f"{label}: {err}" if err else check_pdf(label, data)
+                        if err:
+                            st.warning(f"Skipped {err}")
+                        else:
+                            yield label, data, up, member
+                except ARCHIVE_ERRORS as e:
+                    st.warning(f"Skipped {up.name}: not a readable archive ({e})")
+
+        for name, data, up, member in iter_uploads():
+            try:
+                res = process_resume(data, company_skills=company_skills, file_name=name, jd_text=jd_text)
+            except Exception as e:
+                st.warning(f"Skipped {name}: could not parse ({e})")
+                continue
+            # keep a handle on the upload, not the PDF bytes, so a large archive's
+            # members aren't all held in session state; they're re-read for viewing
+            res["_upload"], res["_member"] = up, member
             results.append(res)
-            os.unlink(tmp_path)
     st.success("✅ Parsing complete!")
     st.session_state["results"] = results
     st.session_state["idx"] = 0  # start at first
@@ -191,7 +216,11 @@ if "results" in st.session_state:
 
     # ─── PDF Viewer ─────────────────────────────────────────────
     st.markdown("##  View Resume")
-    b64 = base64.b64encode(res["_pdf_buffer"]).decode("utf-8")
+    if res["_member"] is None:
+        pdf_bytes = res["_upload"].getvalue()
+    else:
+        pdf_bytes = read_archive_member(res["_upload"], res["_member"]) or b""
+    b64 = base64.b64encode(pdf_bytes).decode("utf-8")
     st.markdown(
         f'<iframe src="data:application/pdf;base64,{b64}" '
         'width="100%" height="1100px"></iframe>',
@@ -0,0 +1,118 @@
+"""
+Stream resumes out of ZIP/tar archives as in-memory bytes, one member at a time,
+so an export of hundreds of resumes never has to be unpacked to disk.
+"""
+import os
+import lzma
+import tarfile
+import zipfile
+import zlib
+from typing import IO, Iterator, Optional, Tuple, Union
+
+# what a broken or mislabelled archive raises while being opened or walked
+ARCHIVE_ERRORS   = (tarfile.TarError, zipfile.BadZipFile, EOFError, zlib.error, lzma.LZMAError)
+# what reading one ZIP member can raise without the rest of the archive being unreadable:
+# encrypted (RuntimeError), unsupported method such as Deflate64 (NotImplementedError),
+# corrupt data (zlib.error, lzma.LZMAError, OSError from bz2), bad CRC (BadZipFile)
+MEMBER_ERRORS    = (RuntimeError, NotImplementedError, OSError) + ARCHIVE_ERRORS
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+MAX_MEMBER_BYTES = int(os.getenv("RESUME_PARSER_MAX_FILE_BYTES", str(10 * 1024 * 1024)))
+
+
+def is_archive(name: str) -> bool:
+    return name.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def _wanted(name: str) -> bool:
+    base = os.path.basename(name)
+    return (
+        name.lower().endswith(".pdf")
+        and not base.startswith(".")         # macOS ._resource forks
+        and "__MACOSX/" not in name
+    )
+
+
+def _seekable(f: IO[bytes]) -> bool:
+    # SpooledTemporaryFile has no seekable() before Python 3.11
+    if hasattr(f, "seekable"):
+        return f.seekable()
+    try:
+        f.tell()
+        return True
+    except (AttributeError, OSError):
+        return False
+
+
+def _read_capped(f: IO[bytes], max_bytes: int) -> Tuple[Optional[bytes], Optional[str]]:
+    # read one byte past the cap so a lying header (zip bomb) can't slip through
+    data = f.read(max_bytes + 1)
+    if len(data) > max_bytes:
+        return None, f"larger than {max_bytes} bytes"
+    return data, None
+
+
+def check_pdf(name: str, data: Optional[bytes], max_bytes: int = MAX_MEMBER_BYTES) -> Optional[str]:
+    """Return why `data` can't be a parseable PDF (prefixed with `name`), else None."""
+    if data is None or len(data) > max_bytes:
+        return f"{name}: larger than {max_bytes} bytes"
+    if not data.startswith(b"%PDF"):
+        return f"{name}: not a PDF"
+    return None
+
+
+def iter_archive_pdfs(
+    source: Union[str, IO[bytes]], max_member_bytes: int = MAX_MEMBER_BYTES
+) -> Iterator[Tuple[str, Optional[bytes], Optional[str]]]:
+    """
+    Yield (member_name, pdf_bytes, error) for every PDF in a ZIP or tar(.gz/.bz2/.xz)
+    archive, given as a path or a binary file object. Members are decompressed one at
+    a time, so only the current member is held in memory. Non-PDFs are skipped.
+
+    A member that can't be read (over `max_member_bytes`, encrypted, unsupported
+    compression, corrupt) comes back as (member_name, None, reason) and the walk goes
+    on; in a tar stream nothing after a corrupt member is readable, so it stops there.
+    Non-seekable streams are read as tar. An archive that can't be opened or walked
+    at all raises one of ARCHIVE_ERRORS.
+    """
+    seekable = isinstance(source, str) or _seekable(source)
+    if seekable and zipfile.is_zipfile(source):
+        if not isinstance(source, str):
+            source.seek(0)
+        with zipfile.ZipFile(source) as zf:
+            for info in zf.infolist():
+                if info.is_dir() or not _wanted(info.filename):
+                    continue
+                try:
+                    with zf.open(info) as f:
+                        data, err = _read_capped(f, max_member_bytes)
+                except MEMBER_ERRORS as e:
+                    data, err = None, f"unreadable ({type(e).__name__}: {e})"
+                yield info.filename, data, err
+        return
+
+    if isinstance(source, str):
+        tf = tarfile.open(source, mode="r|*")
+    else:
+        if seekable:
+            source.seek(0)
+        tf = tarfile.open(fileobj=source, mode="r|*")
+    with tf:
+        for member in tf:
+            if not member.isfile() or not _wanted(member.name):
+                continue
+            try:
+                data, err = _read_capped(tf.extractfile(member), max_member_bytes)
+            except MEMBER_ERRORS as e:
+                yield member.name, None, f"unreadable ({type(e).__name__}: {e})"
+                return
+            yield member.name, data, err
+
+
+def read_archive_member(source: Union[str, IO[bytes]], name: str) -> Optional[bytes]:
+    """Re-read one PDF member by name, e.g. to display it after parsing; None if missing."""
+    if not isinstance(source, str):
+        source.seek(0)
+    for member, data, _ in iter_archive_pdfs(source):
+        if member == name:
+            return data
+    return None
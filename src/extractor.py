@@ -1,7 +1,9 @@
+import io
 import os
 import re
 import json
-from typing import List, Tuple, Optional,Dict
+import time
+from typing import List, Tuple, Optional, Dict, Union
 
 import fitz               # PyMuPDF
 import pdfplumber
@@ -10,23 +12,67 @@ from PIL import Image
 import spacy
 from dotenv import load_dotenv
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
 import streamlit as st
 
+# ─── Fake LLM Backend (local runs & load tests) ────────────────────────────────
+class _FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """
+    Offline stand-in for `genai.GenerativeModel`, enabled with RESUME_PARSER_FAKE_LLM=1.
+    Answers the three prompts this module sends with deterministic JSON, after an
+    optional RESUME_PARSER_FAKE_LLM_LATENCY (seconds) delay to mimic the real API.
+    A `request_options` timeout shorter than that delay raises DeadlineExceeded after
+    the timeout, like the real client.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+
+    def generate_content(self, prompt: str, request_options: Optional[dict] = None, **kwargs) -> _FakeResponse:
+        timeout = (request_options or {}).get("timeout")
+        if timeout is not None and timeout < self.latency:
+            time.sleep(timeout)
+            raise google_exceptions.DeadlineExceeded(f"fake LLM call exceeded {timeout:g}s")
+        if self.latency:
+            time.sleep(self.latency)
+        if "EXPERIENCE:\n" in prompt:
+            experience = prompt.split("EXPERIENCE:\n", 1)[1].rsplit("\n\nOUTPUT:", 1)[0]
+            arr = []
+            for pair in extract_companies_positions_regex(experience):
+                comp, _, pos = pair.partition("-")
+                arr.append({"company": comp, "position": pos})
+            return _FakeResponse(json.dumps(arr))
+        if "KEYWORDS:\n" in prompt:
+            raw = prompt.split("KEYWORDS:\n", 1)[1].rsplit("\n\nOUTPUT:", 1)[0]
+            return _FakeResponse(json.dumps({k: 1.0 for k in json.loads(raw)}))
+        return _FakeResponse("[]")
+
+
 # ─── Load Secrets & Initialize LLM ─────────────────────────────────────────────
 load_dotenv()  # reads .env in project root
-API_KEY = st.secrets.get("GOOGLE_API_KEY")
-if not API_KEY:
-    load_dotenv()  # looks for .env in project root
-    API_KEY = os.getenv("GOOGLE_API_KEY")
+FAKE_LLM = os.getenv("RESUME_PARSER_FAKE_LLM", "").lower() in ("1", "true", "yes")
+
+if FAKE_LLM:
+    GENIE_MODEL = FakeGenerativeModel(float(os.getenv("RESUME_PARSER_FAKE_LLM_LATENCY", "0")))
+else:
+    API_KEY = st.secrets.get("GOOGLE_API_KEY")
+    if not API_KEY:
+        load_dotenv()  # looks for .env in project root
+        API_KEY = os.getenv("GOOGLE_API_KEY")
 
-if not API_KEY:
-    st.error("🚨 Missing GOOGLE_API_KEY! Put it in `.env` locally, or in Streamlit Cloud secrets.")
-    st.stop()
+    if not API_KEY:
+        st.error("🚨 Missing GOOGLE_API_KEY! Put it in `.env` locally, or in Streamlit Cloud secrets.")
+        st.stop()
 
-# configure Gemini via Generative AI Studio
-genai.configure(api_key=API_KEY)
-# use the “pro” variant (1.5) on free tier
-GENIE_MODEL = genai.GenerativeModel("gemini-1.5-flash")
+    # configure Gemini via Generative AI Studio
+    genai.configure(api_key=API_KEY)
+    # use the “pro” variant (1.5) on free tier
+    GENIE_MODEL = genai.GenerativeModel("gemini-1.5-flash")
 
 # ─── Constants ────────────────────────────────────────────────────────────────
 SECTION_KEYWORDS = {
@@ -55,29 +101,140 @@ GITHUB_REGEX   = r"^(?:https?://)?(?:www\.)?github\.com/[A-Za-z0-9_-]+/?$"
 # load spaCy NER model
 nlp = spacy.load("en_core_web_sm")
 
+# ─── Latency Budget ───────────────────────────────────────────────────────────
+# `deadline` arguments are time.time() timestamps. As time runs out each stage
+# degrades in this order, appending its tag to the caller's `degradations` list:
+#   1. OCR at OCR_LOW_DPI, then stop OCR-ing after the first page
+#   2. no Gemini JD phrases; keyword weights default to 1.0
+#   3. skip the spaCy PERSON fallback for the name
+#   4. regex instead of Gemini for company–position pairs
+# A Gemini call cut off by the deadline falls back the same way and is tagged too.
+OCR_DPI             = 200
+OCR_LOW_DPI         = 100
+OCR_LOW_DPI_BELOW   = 30.0   # seconds left → render OCR pages at OCR_LOW_DPI
+OCR_STOP_BELOW      = 15.0   # seconds left → OCR no further pages
+NAME_NER_MIN_LEFT   = 5.0    # seconds needed to run the spaCy name fallback
+GEMINI_MIN_LEFT     = 5.0    # seconds needed to make a Gemini call
+
+DEGRADE_OCR_LOW_DPI  = "ocr_low_dpi"
+DEGRADE_OCR_PAGES    = "ocr_pages_skipped"
+DEGRADE_NAME_NER     = "name_ner_skipped"
+DEGRADE_COMPANIES    = "companies_regex"
+DEGRADE_JD_PHRASES   = "jd_phrases_skipped"
+DEGRADE_JD_WEIGHTS   = "jd_weights_default"
+
+
+def time_left(deadline: Optional[float]) -> Optional[float]:
+    """Seconds until `deadline`, or None when there is no deadline."""
+    return None if deadline is None else deadline - time.time()
+
+
+def _degrade(degradations: Optional[List[str]], tag: str) -> None:
+    if degradations is not None and tag not in degradations:
+        degradations.append(tag)
+
+
+def _too_late_for_gemini(deadline: Optional[float]) -> bool:
+    left = time_left(deadline)
+    return left is not None and left < GEMINI_MIN_LEFT
+
+
+def _cut_off(deadline: Optional[float]) -> bool:
+    """True if a failed Gemini call was most likely stopped by the deadline cap."""
+    left = time_left(deadline)
+    return left is not None and left < 1.0
+
+
+def _request_options(deadline: Optional[float]) -> dict:
+    """Cap a Gemini call at the time left, so a slow response can't overrun the deadline."""
+    left = time_left(deadline)
+    return {} if left is None else {"request_options": {"timeout": max(left, 1.0)}}
+
 
 # ─── Text & Link Extraction ──────────────────────────────────────────────────
-def extract_text_and_links(path: str) -> Tuple[str, List[str]]:
-    """Extract full text plus all hyperlink URIs via PyMuPDF, fallback/pdfplumber, then OCR."""
-    text, links = "", set()
-    doc = fitz.open(path)
+def open_pdf(source: Union[str, bytes]) -> "fitz.Document":
+    """Open a PDF from a file path or from in-memory bytes."""
+    if isinstance(source, str):
+        return fitz.open(source)
+    return fitz.open(stream=source, filetype="pdf")
+
+
+# (line text, font size, bold, alone in its text block) for each non-empty PDF line
+LayoutLine = Tuple[str, float, bool, bool]
+
+
+def extract_layout(
+    source: Union[str, bytes],
+    deadline: Optional[float] = None,
+    degradations: Optional[List[str]] = None,
+) -> Tuple[str, List[str], List[str], List[Tuple[int, str, str]]]:
+    """
+    Single pass over PyMuPDF `get_text("dict")` spans that collects the text, hyperlink
+    URIs, cleaned lines and section headings together. Returns (text, links, lines, heads)
+    where `heads` has the `debug_headings` shape and indexes into `lines`.
+
+    If there is no usable text layer, falls back to pdfplumber, then OCR (degraded near
+    `deadline`), and headings come from the plain-text keyword scan.
+    """
+    links, layout = set(), []
+    doc = open_pdf(source)
     for page in doc:
-        text += page.get_text()
+        for block in page.get_text("dict")["blocks"]:
+            if block.get("type") != 0:  # image block
+                continue
+            rows = []
+            for line in block["lines"]:
+                spans = [sp for sp in line["spans"] if sp["text"].strip()]
+                if not spans:
+                    continue
+                rows.append((
+                    "".join(sp["text"] for sp in line["spans"]).strip(),
+                    max(sp["size"] for sp in spans),
+                    all(sp["flags"] & 16 or "bold" in sp["font"].lower() for sp in spans),
+                ))
+            layout.extend((ln, size, bold, len(rows) == 1) for ln, size, bold in rows)
         for link in page.get_links():
             uri = link.get("uri")
             if uri:
                 links.add(uri.rstrip("/"))
-    if len(text) < 50:
-        # fallback to pdfplumber
-        with pdfplumber.open(path) as pdf:
-            text = "\n".join(p.extract_text() or "" for p in pdf.pages)
+
+    lines = [row[0] for row in layout]
+    text = "\n".join(lines)
+    if len(text) >= 50:
+        return text, list(links), lines, detect_layout_headings(layout)
+
+    # fallback to pdfplumber
+    with pdfplumber.open(source if isinstance(source, str) else io.BytesIO(source)) as pdf:
+        text = "\n".join(p.extract_text() or "" for p in pdf.pages)
     if len(text) < 50:
         # OCR fallback
-        for page in doc:
-            pix = page.get_pixmap(dpi=200)
+        for i, page in enumerate(doc):
+            left, dpi = time_left(deadline), OCR_DPI
+            if left is not None and left < OCR_STOP_BELOW and i > 0:
+                _degrade(degradations, DEGRADE_OCR_PAGES)
+                break
+            if left is not None and left < OCR_LOW_DPI_BELOW:
+                _degrade(degradations, DEGRADE_OCR_LOW_DPI)
+                dpi = OCR_LOW_DPI
+            pix = page.get_pixmap(dpi=dpi)
             img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
             text += "\n" + pytesseract.image_to_string(img)
-    return text, list(links)
+    lines = split_lines(text)
+    return text, list(links), lines, debug_headings(lines)
+
+
+def extract_text_and_links(
+    source: Union[str, bytes],
+    deadline: Optional[float] = None,
+    degradations: Optional[List[str]] = None,
+) -> Tuple[str, List[str]]:
+    """Extract full text plus all hyperlink URIs via PyMuPDF, fallback/pdfplumber, then OCR.
+
+    `source` is either a path on disk or the raw PDF bytes. Near `deadline` OCR drops
+    to a lower DPI and then stops after the first page.
+    """
+    text, links, _, _ = extract_layout(source, deadline, degradations)
+    return text, links
 
 
 # ─── Sectioning Utilities ────────────────────────────────────────────────────
@@ -96,6 +253,75 @@ def debug_headings(lines: List[str]) -> List[Tuple[int, str, str]]:
     return hs
 
 
+HEADING_SIZE_RATIO = 1.1     # a prefix-only heading's font must be ≥ this × body font size
+HEADING_MAX_WORDS  = 4
+BULLET_CHARS       = "•·▪◦●■○-–—*>"
+
+
+def _body_style(layout: List[LayoutLine]) -> Tuple[float, bool]:
+    """Most common (font size, bold) pair, weighted by characters."""
+    weight: Dict[Tuple[float, bool], int] = {}
+    for ln, size, bold, _ in layout:
+        key = (round(size * 2) / 2, bold)
+        weight[key] = weight.get(key, 0) + len(ln)
+    return max(weight, key=weight.get) if weight else (0.0, False)
+
+
+def _keyword_section(ln: str) -> Tuple[Optional[str], bool]:
+    """(section, exact) for a short line naming a section keyword, else (None, False)."""
+    words = re.sub(r"[^a-z&/ ]", " ", ln.lower()).split()
+    if not words or len(words) > HEADING_MAX_WORDS:
+        return None, False
+    norm = " ".join(words)
+    for sec, kws in SECTION_KEYWORDS.items():
+        if norm in kws:
+            return sec, True
+    for sec, kws in SECTION_KEYWORDS.items():
+        if any(norm.startswith(k) for k in kws):
+            return sec, False
+    return None, False
+
+
+def detect_layout_headings(layout: List[LayoutLine]) -> List[Tuple[int, str, str]]:
+    """
+    Like `debug_headings`, but uses the layout to drop false headings. Lines that are
+    exactly a section keyword ("Education", "WORK EXPERIENCE") are headings, and a line
+    that only *starts* with one ("Skills gained…", a bold "Projects Manager") counts
+    only if its font is larger than body text. Bullets are never headings.
+
+    The layout is trusted only if the exact-keyword lines agree: same font size,
+    weight and case, or each alone in its block. Otherwise this falls back to
+    `debug_headings`, so a heading styled unlike the others isn't lost.
+    """
+    body_size, _ = _body_style(layout)
+    exact, prefix = [], []
+    for i, (ln, size, bold, alone) in enumerate(layout):
+        if ln[0] in BULLET_CHARS:
+            continue
+        sec, is_exact = _keyword_section(ln)
+        if sec is None:
+            continue
+        if is_exact:
+            exact.append((i, ln, sec))
+        elif size >= body_size * HEADING_SIZE_RATIO:
+            prefix.append((i, ln, sec))
+
+    styles = {(round(layout[i][1] * 2) / 2, layout[i][2], ln.isupper()) for i, ln, _ in exact}
+    positioned = all(layout[i][3] for i, _, _ in exact)
+    if not exact or (len(styles) > 1 and not positioned):
+        return debug_headings([row[0] for row in layout])
+    return sorted(exact + prefix)
+
+
+def section_map(heads: List[Tuple[int, str, str]]) -> Dict[str, Tuple[int, Optional[int]]]:
+    """(start, end) line bounds per section; the first heading of a section wins, as in `find_section_bounds`."""
+    sections = {}
+    for idx, (ln, _, sec) in enumerate(heads):
+        if sec not in sections:
+            sections[sec] = (ln + 1, heads[idx + 1][0] if idx + 1 < len(heads) else None)
+    return sections
+
+
 def find_section_bounds(
     heads: List[Tuple[int, str, str]], target: str
 ) -> Tuple[Optional[int], Optional[int]]:
@@ -116,12 +342,18 @@ def extract_section(
 
 
 # ─── Field Extractors ────────────────────────────────────────────────────────
-def extract_name(lines: List[str]) -> Optional[str]:
+def extract_name(
+    lines: List[str], deadline: Optional[float] = None, degradations: Optional[List[str]] = None
+) -> Optional[str]:
     # 1–4 capitalized tokens
     pat = r"^[A-Z][a-zA-Z’'-]+(?:\s+[A-Z][a-zA-Z’'-]+){0,3}$"
     for ln in lines[:10]:
         if re.match(pat, ln):
             return ln
+    left = time_left(deadline)
+    if left is not None and left < NAME_NER_MIN_LEFT:
+        _degrade(degradations, DEGRADE_NAME_NER)
+        return None
     # spaCy PERSON fallback
     doc = nlp(" ".join(lines[:50]))
     for ent in doc.ents:
@@ -239,11 +471,18 @@ def extract_companies_positions_regex(experience: str) -> List[str]:
     return pairs
 
 
-def extract_companies_positions_gemini(experience: str) -> List[str]:
-    """Primary extractor via Gemini; falls back to regex if anything fails."""
+def extract_companies_positions_gemini(
+    experience: str, deadline: Optional[float] = None, degradations: Optional[List[str]] = None
+) -> List[str]:
+    """Primary extractor via Gemini; falls back to regex if anything fails or time is short."""
     if not experience:
         return []
 
+    if _too_late_for_gemini(deadline):
+        print("⏱ [Gemini] Not enough time left. Using regex.")
+        _degrade(degradations, DEGRADE_COMPANIES)
+        return extract_companies_positions_regex(experience)
+
     prompt = (
         "You are a parser. Given the following EXPERIENCE section from a resume, "
         "output _only_ a JSON array of objects with exactly two keys: "
@@ -255,11 +494,13 @@ def extract_companies_positions_gemini(experience: str) -> List[str]:
 
     print("↪ [Gemini] Sending prompt…")
     try:
-        resp = GENIE_MODEL.generate_content(prompt)
+        resp = GENIE_MODEL.generate_content(prompt, **_request_options(deadline))
         raw = resp.text.strip() 
         print("🔍 [Gemini] Raw output:", raw)
     except Exception as e:
         print(f"❌ [Gemini] API error: {e}. Falling back to regex.")
+        if _cut_off(deadline):
+            _degrade(degradations, DEGRADE_COMPANIES)
         return extract_companies_positions_regex(experience)
 
     # strip echoed prompt if present
@@ -281,13 +522,22 @@ def extract_companies_positions_gemini(experience: str) -> List[str]:
         return extract_companies_positions_regex(experience)
     
 
-def extract_jd_phrases(jd_text: str, max_phrases: int = 20) -> List[str]:
+def extract_jd_phrases(
+    jd_text: str,
+    max_phrases: int = 20,
+    deadline: Optional[float] = None,
+    degradations: Optional[List[str]] = None,
+) -> List[str]:
     """
     Use Gemini to pull out the top `max_phrases` key skills/phrases
     from the job description text, returning a lowercase list.
     """
     if not jd_text or not GENIE_MODEL:
         return []
+    if _too_late_for_gemini(deadline):
+        print("⏱ [Gemini] Not enough time left. Skipping JD phrases.")
+        _degrade(degradations, DEGRADE_JD_PHRASES)
+        return []
 
     prompt = (
         f"You are a keyword extraction assistant. "
@@ -299,7 +549,7 @@ def extract_jd_phrases(jd_text: str, max_phrases: int = 20) -> List[str]:
     )
 
     try:
-        resp = GENIE_MODEL.generate_content(prompt)
+        resp = GENIE_MODEL.generate_content(prompt, **_request_options(deadline))
         raw = resp.text.strip()
         # strip any code fences
         raw = re.sub(r"^```json\s*|\s*```$", "", raw, flags=re.IGNORECASE).strip()
@@ -308,6 +558,8 @@ def extract_jd_phrases(jd_text: str, max_phrases: int = 20) -> List[str]:
         return [p.lower() for p in phrases][:max_phrases]
     except Exception as e:
         print(f"❌ [Gemini] JD keyword extraction failed: {e}")
+        if _cut_off(deadline):
+            _degrade(degradations, DEGRADE_JD_PHRASES)
         return []
 
 
@@ -325,11 +577,20 @@ def load_company_skills(path="company_skills.json") -> List[str]:
         return [s.lower() for s in data.get("required_skills", [])]
     except FileNotFoundError:
         return []
-def extract_jd_keyword_weights(jd_text: str, keywords: List[str]) -> Dict[str, float]:
+def extract_jd_keyword_weights(
+    jd_text: str,
+    keywords: List[str],
+    deadline: Optional[float] = None,
+    degradations: Optional[List[str]] = None,
+) -> Dict[str, float]:
     """
     Prompt Gemini to rate each keyword 0–1 based on its importance in the JD.
     Returns a dict {keyword: weight}.
     """
+    if keywords and _too_late_for_gemini(deadline):
+        print("⏱ [Gemini] Not enough time left. Using equal keyword weights.")
+        _degrade(degradations, DEGRADE_JD_WEIGHTS)
+        return {k.lower(): 1.0 for k in keywords}
     prompt = (
         "You are an assistant that ranks how important each skill is "
         "for this job description.  Output strictly JSON mapping each "
@@ -339,7 +600,7 @@ def extract_jd_keyword_weights(jd_text: str, keywords: List[str]) -> Dict[str, f
         "OUTPUT:\n"
     )
     try:
-        resp = GENIE_MODEL.generate_content(prompt)
+        resp = GENIE_MODEL.generate_content(prompt, **_request_options(deadline))
         raw = resp.text.strip()
         raw = re.sub(r"^```json\s*|\s*```$", "", raw, flags=re.IGNORECASE).strip()
         weights = json.loads(raw)
@@ -347,5 +608,7 @@ def extract_jd_keyword_weights(jd_text: str, keywords: List[str]) -> Dict[str, f
         return {k.lower(): float(v) for k, v in weights.items() if k.lower() in map(str.lower, keywords)}
     except Exception as e:
         print("⚠️ Gemini weight extraction failed:", e)
+        if _cut_off(deadline):
+            _degrade(degradations, DEGRADE_JD_WEIGHTS)
         # fallback to equal weights
         return {k.lower(): 1.0 for k in keywords}
@@ -2,12 +2,12 @@ import os
 import json
 import csv
 import re
-from typing import List, Tuple, Optional,Dict
+import time
+from typing import List, Tuple, Optional, Dict, Union, Iterator
+from src.archive import ARCHIVE_ERRORS, check_pdf, is_archive, iter_archive_pdfs
 from src.extractor import (
-    extract_text_and_links,
-    split_lines,
-    debug_headings,
-    find_section_bounds,
+    extract_layout,
+    section_map,
     extract_section,
     extract_name,
     extract_email,
@@ -25,22 +25,39 @@ from src.extractor import (
 
 
 # ─── Configuration ────────────────────────────────────────────────────────────
-RESUME_DIR  = "resumes"        # put your PDFs here
+RESUME_DIR  = "resumes"        # put your PDFs (or ZIP/tar archives of PDFs) here
 OUTPUT_JSON = "output.json"
 OUTPUT_CSV  = "output.csv"
-
-def process_resume(path: str, jd_path: Optional[str] = None, company_skills: Optional[List[str]] = None) -> dict:
-    print(f"\n📄 Processing: {os.path.basename(path)}")
-    text, links = extract_text_and_links(path)
-
-    print("  • Splitting lines & detecting sections…")
-    lines = split_lines(text)
-    heads = debug_headings(lines)
+RESUME_BUDGET = 60.0           # seconds per resume before stages start degrading
+
+def process_resume(
+    path: Union[str, bytes],
+    jd_path: Optional[str] = None,
+    company_skills: Optional[List[str]] = None,
+    file_name: Optional[str] = None,
+    jd_text: Optional[str] = None,
+    deadline: Optional[float] = None,
+) -> dict:
+    """
+    Parse one resume. `path` is a PDF on disk or its raw bytes; for bytes pass
+    `file_name` so the result can be labelled. `jd_text` takes precedence over `jd_path`.
+
+    `deadline` is a time.time() timestamp; as it nears, OCR, the Gemini JD calls, the
+    spaCy name fallback and the Gemini company–position call degrade in that order,
+    and the tags of whatever degraded are returned under "degradations".
+    """
+    degradations: List[str] = []
+    if file_name is None:
+        file_name = os.path.basename(path) if isinstance(path, str) else "resume.pdf"
+    print(f"\n📄 Processing: {file_name}")
+    print("  • Extracting text, links & sections…")
+    text, links, lines, heads = extract_layout(path, deadline, degradations)
 
     # Sections
-    exp_s, exp_e = find_section_bounds(heads, "experience")
-    edu_s, edu_e = find_section_bounds(heads, "education")
-    skl_s, skl_e = find_section_bounds(heads, "skills")
+    sections = section_map(heads)
+    exp_s, exp_e = sections.get("experience", (None, None))
+    edu_s, edu_e = sections.get("education", (None, None))
+    skl_s, skl_e = sections.get("skills", (None, None))
 
     experience = extract_section(lines, exp_s, exp_e)
     education  = extract_section(lines, edu_s, edu_e)
@@ -48,8 +65,9 @@ def process_resume(path: str, jd_path: Optional[str] = None, company_skills: Opt
      
      
         # ─── ATS logic ─────────────────────────────────────────────────
-    jd_text      = load_job_description(jd_path) if jd_path else ""
-    jd_phrases   = extract_jd_phrases(jd_text)
+    if jd_text is None:
+        jd_text  = load_job_description(jd_path) if jd_path else ""
+    jd_phrases   = extract_jd_phrases(jd_text, deadline=deadline, degradations=degradations)
 
     # Combine UI-inputted skills + JD phrases
     required_set = set(company_skills or []) | set(jd_phrases)
@@ -57,7 +75,7 @@ def process_resume(path: str, jd_path: Optional[str] = None, company_skills: Opt
     required = list(required_set)
 
     # 2) get weights from Gemini
-    weights = extract_jd_keyword_weights(jd_text, required)
+    weights = extract_jd_keyword_weights(jd_text, required, deadline=deadline, degradations=degradations)
 
     # 3) scan resume text for frequency
     text_lower = text.lower()
@@ -80,7 +98,7 @@ def process_resume(path: str, jd_path: Optional[str] = None, company_skills: Opt
     print(f"    – Skills found: {len(skills)}")
 
     # Basic fields
-    name     = extract_name(lines)
+    name     = extract_name(lines, deadline, degradations)
     email    = extract_email(text)
     phone    = extract_phone(text)
     linkedin = extract_linkedin(text, links)
@@ -92,10 +110,12 @@ def process_resume(path: str, jd_path: Optional[str] = None, company_skills: Opt
     print(f"    – GitHub: {github}")
 
     # Company–Position
-    comps = extract_companies_positions_gemini(experience or "")
+    comps = extract_companies_positions_gemini(experience or "", deadline, degradations)
+    if degradations:
+        print(f"    – Degraded: {', '.join(degradations)}")
 
     return {
-        "file_name": os.path.basename(path),
+        "file_name": file_name,
         "name": name,
         "email": email,
         "phone": phone,
@@ -110,23 +130,52 @@ def process_resume(path: str, jd_path: Optional[str] = None, company_skills: Opt
         "experience_section": experience,
         "companies_positions": comps,
         "education_section": education,
-        
+        "degradations": degradations,
     }
 
 
+def iter_resumes(directory: str) -> Iterator[Tuple[str, Union[str, bytes]]]:
+    """
+    Yield (file_name, path-or-bytes) for each loose PDF in `directory`, then for each
+    PDF inside any ZIP/tar archive there, read one member at a time without unpacking.
+    Unreadable, oversized or non-PDF members and unreadable archives are skipped
+    with a warning.
+    """
+    names = sorted(os.listdir(directory))
+    for fn in names:
+        if fn.lower().endswith(".pdf"):
+            yield fn, os.path.join(directory, fn)
+    for fn in names:
+        if not is_archive(fn):
+            continue
+        try:
+            for member, data, err in iter_archive_pdfs(os.path.join(directory, fn)):
+                label = f"{fn}/{member}"
+                err = f"{label}: {err}" if err else check_pdf(label, data)
+                if err:
+                    print(f"⚠️ Skipping {err}")
+                    continue
+                yield label, data
+        except ARCHIVE_ERRORS as e:
+            print(f"⚠️ Skipping {fn}: not a readable archive ({e})")
+
+
 def main():
     os.makedirs(RESUME_DIR, exist_ok=True)
-    files = [
-        f
-        for f in os.listdir(RESUME_DIR)
-        if f.lower().endswith(".pdf")
-    ]
-    print(f"🔍 Found {len(files)} resumes in {RESUME_DIR}")
+    names = os.listdir(RESUME_DIR)
+    n_pdfs = sum(f.lower().endswith(".pdf") for f in names)
+    n_archives = sum(is_archive(f) for f in names)
+    print(f"🔍 Found {n_pdfs} resumes and {n_archives} archives in {RESUME_DIR}")
 
     results = []
-    for idx, fn in enumerate(files, 1):
-        print(f"\n=== {idx}/{len(files)} ===")
-        res = process_resume(os.path.join(RESUME_DIR, fn))
+    for idx, (fn, source) in enumerate(iter_resumes(RESUME_DIR), 1):
+        print(f"\n=== {idx} ===")
+        try:
+            res = process_resume(source, file_name=fn, deadline=time.time() + RESUME_BUDGET)
+        except Exception as e:
+            # one corrupt PDF shouldn't cost the rest of the run
+            print(f"❌ Failed to parse {fn}: {e}")
+            continue
         results.append(res)
 
     # Write JSON
@@ -141,6 +190,7 @@ def main():
         for r in results:
             r["skills"]              = ";".join(r["skills"])
             r["companies_positions"] = "|".join(r["companies_positions"])
+            r["degradations"]        = "|".join(r["degradations"])
             writer.writerow(r)
     print(f"✅ Wrote {OUTPUT_CSV}")
 
@@ -0,0 +1,534 @@
+"""
+Local HTTP service around `process_resume`.
+
+Keeps spaCy and Gemini warm inside a shared pool of worker processes and accepts
+PDF bytes directly, so callers don't pay model setup per run or need files on disk.
+
+    POST /parse   raw PDF body (or multipart with one file)  → one JSON result
+    POST /batch   multipart/form-data with many files         → NDJSON, one line per
+                                                                resume as it finishes
+    POST /archive raw ZIP/tar(.gz) body                       → NDJSON, members are fed
+                                                                to the pool as they're read
+    GET  /health                                              → pool/queue status
+
+Multipart fields: any part with a filename is a resume; optional `skills`
+(comma-separated) and `jd` (job description text) apply to every resume.
+For /parse with a raw body, pass `file_name` and `skills` as query params;
+/archive takes `skills` and `jd` (URL-encoded job description) the same way.
+
+Run with `python -m src.service`; add `--fake-llm` to swap Gemini for an offline
+fake so the service can be load-tested locally.
+"""
+import os
+import json
+import time
+import argparse
+import itertools
+import multiprocessing
+import queue
+import tempfile
+import threading
+from concurrent.futures import (
+    Future,
+    ProcessPoolExecutor,
+    wait,
+    FIRST_COMPLETED,
+)
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import IO, List, Tuple, Optional, Dict, Iterable, Iterator
+from urllib.parse import urlparse, parse_qs
+
+from src.archive import ARCHIVE_ERRORS, check_pdf, iter_archive_pdfs
+
+
+# ─── Configuration ────────────────────────────────────────────────────────────
+HOST             = os.getenv("RESUME_PARSER_HOST", "127.0.0.1")
+PORT             = int(os.getenv("RESUME_PARSER_PORT", "8000"))
+WORKERS          = int(os.getenv("RESUME_PARSER_WORKERS", str(os.cpu_count() or 2)))
+MAX_QUEUE        = int(os.getenv("RESUME_PARSER_MAX_QUEUE", "64"))         # resumes queued or running
+MAX_BATCH_FILES  = int(os.getenv("RESUME_PARSER_MAX_BATCH_FILES", "50"))
+MAX_FILE_BYTES   = int(os.getenv("RESUME_PARSER_MAX_FILE_BYTES", str(10 * 1024 * 1024)))
+MAX_BODY_BYTES   = int(os.getenv("RESUME_PARSER_MAX_BODY_BYTES", str(100 * 1024 * 1024)))
+MAX_ARCHIVE_BYTES = int(os.getenv("RESUME_PARSER_MAX_ARCHIVE_BYTES", str(1024 * 1024 * 1024)))
+RESUME_TIMEOUT   = float(os.getenv("RESUME_PARSER_TIMEOUT", "120"))        # seconds, from when a worker starts it
+POLL_SECONDS     = 0.5                                                     # how often start notices are checked
+RESUME_BUDGET    = float(os.getenv("RESUME_PARSER_BUDGET", "90"))          # seconds before stages degrade
+
+# (file_name, pdf_bytes)
+Upload = Tuple[str, bytes]
+
+
+# ─── Worker Side ──────────────────────────────────────────────────────────────
+_started_q = None  # per-worker handle on the pool's start-notice queue
+
+
+def _warm_worker(started_q=None) -> None:
+    """Import the pipeline once per worker so spaCy and Gemini load before the first job."""
+    global _started_q
+    _started_q = started_q
+    import src.pipeline  # noqa: F401
+
+
+def _ping() -> None:
+    pass
+
+
+def _mark_started(job_id: int) -> None:
+    """Tell the pool this job left the queue; its timeout is counted from here."""
+    if _started_q is not None:
+        _started_q.put((job_id, time.time()))
+
+
+def _parse_job(
+    job_id: int, data: bytes, file_name: str, jd_text: str, company_skills: List[str], budget: float
+) -> dict:
+    _mark_started(job_id)
+    # the budget starts here, not at submission, so queue wait doesn't eat into it
+    deadline = time.time() + budget
+    from src.pipeline import process_resume
+    return process_resume(
+        data, company_skills=company_skills, file_name=file_name, jd_text=jd_text, deadline=deadline
+    )
+
+
+# ─── Worker Pool ──────────────────────────────────────────────────────────────
+class QueueFullError(Exception):
+    """Raised when a submission would exceed the pool's queue limit."""
+
+
+class ResumeWorkerPool:
+    """Process pool with a bounded queue; every queued or running resume holds one slot."""
+
+    def __init__(self, workers: int = WORKERS, max_queue: int = MAX_QUEUE, budget: float = RESUME_BUDGET):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.budget = budget
+        self._started_q = multiprocessing.Queue()
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers, initializer=_warm_worker, initargs=(self._started_q,)
+        )
+        self._slots = threading.BoundedSemaphore(max_queue)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._job_ids = itertools.count()
+        self._job_of: Dict[Future, int] = {}
+        self._started: Dict[int, float] = {}
+
+    def warm(self) -> None:
+        """Start every worker and wait for its models to load."""
+        for fut in [self._executor.submit(_ping) for _ in range(self.workers)]:
+            fut.result()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _release(self, fut: Future) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self._started.pop(self._job_of.pop(fut, None), None)
+        self._slots.release()
+
+    def started_at(self, fut: Future) -> Optional[float]:
+        """time.time() at which a worker picked up `fut`, or None while it's still queued."""
+        with self._lock:
+            while True:
+                try:
+                    job_id, at = self._started_q.get_nowait()
+                except queue.Empty:
+                    break
+                if job_id in self._job_of.values():
+                    self._started[job_id] = at
+            return self._started.get(self._job_of.get(fut))
+
+    def submit_many(
+        self, uploads: List[Upload], jd_text: str = "", company_skills: Optional[List[str]] = None
+    ) -> List[Future]:
+        """
+        Queue all uploads or none of them; raises QueueFullError if slots run out.
+        Each resume gets `budget` seconds from when a worker starts on it.
+        """
+        taken = 0
+        for _ in uploads:
+            if not self._slots.acquire(blocking=False):
+                for _ in range(taken):
+                    self._slots.release()
+                raise QueueFullError(f"queue full ({self.max_queue} resumes in flight)")
+            taken += 1
+
+        return [
+            self._submit_reserved(file_name, data, jd_text, company_skills or [])
+            for file_name, data in uploads
+        ]
+
+    def _submit_reserved(
+        self, file_name: str, data: bytes, jd_text: str, company_skills: List[str]
+    ) -> Future:
+        """Submit one resume whose queue slot is already held."""
+        job_id = next(self._job_ids)
+        with self._lock:
+            self._in_flight += 1
+            fut = self._executor.submit(
+                _parse_job, job_id, data, file_name, jd_text, company_skills, self.budget
+            )
+            self._job_of[fut] = job_id
+        fut.add_done_callback(self._release)
+        return fut
+
+    def stream(
+        self,
+        uploads: Iterable[Upload],
+        jd_text: str = "",
+        company_skills: Optional[List[str]] = None,
+        window: Optional[int] = None,
+        timeout: float = RESUME_TIMEOUT,
+    ) -> Iterator[Tuple[int, str, Optional[dict], Optional[str]]]:
+        """
+        Feed `uploads` to the pool as they are read and yield (index, file_name, result,
+        error) as each finishes. At most `window` of them are queued or running, so only
+        that many PDFs sit in memory; reading pauses until one finishes. Each resume gets
+        `budget` seconds from when a worker starts on it and is reported as timed out once
+        it has run for `timeout`. Raises QueueFullError if no slot frees up within `timeout`.
+        """
+        window = min(window or self.workers * 2, self.max_queue)
+        running: Dict[Future, Tuple[int, str]] = {}
+        try:
+            for index, (file_name, data) in enumerate(uploads):
+                while True:
+                    if len(running) < window and self._slots.acquire(blocking=False):
+                        break
+                    if running:
+                        yield from self._reap(running, timeout)
+                    elif self._slots.acquire(timeout=timeout):
+                        break
+                    else:
+                        raise QueueFullError(f"queue full ({self.max_queue} resumes in flight)")
+                fut = self._submit_reserved(file_name, data, jd_text, company_skills or [])
+                running[fut] = (index, file_name)
+
+            while running:
+                yield from self._reap(running, timeout)
+        finally:
+            # caller stopped early (client gone, bad member): drop what hasn't started
+            for fut in running:
+                fut.cancel()
+
+    def _reap(self, running: Dict[Future, Tuple[int, str]], timeout: float):
+        """
+        Wait for one of `running` to finish (or POLL_SECONDS), then yield and drop
+        those that finished or have been running longer than `timeout`. Time spent
+        queued behind other resumes doesn't count against a resume.
+        """
+        done, _ = wait(list(running), timeout=POLL_SECONDS, return_when=FIRST_COMPLETED)
+        now = time.time()
+        for fut, (index, file_name) in sorted(running.items(), key=lambda kv: kv[1][0]):
+            started = self.started_at(fut)
+            if fut in done:
+                del running[fut]
+                try:
+                    yield index, file_name, fut.result(), None
+                except Exception as e:
+                    yield index, file_name, None, f"{type(e).__name__}: {e}"
+            elif started is not None and started + timeout <= now:
+                del running[fut]
+                yield index, file_name, None, f"timed out after {timeout:g}s"
+
+    def iter_completed(self, futures: List[Future], timeout: float = RESUME_TIMEOUT):
+        """
+        Yield (index, result, error) for each future as it finishes. A future still
+        unfinished `timeout` seconds after a worker picked it up is reported as timed
+        out; its worker is left to finish, and its queue slot is only freed then.
+        """
+        running = {fut: (i, "") for i, fut in enumerate(futures)}
+        while running:
+            for index, _, result, error in self._reap(running, timeout):
+                yield index, result, error
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# ─── Request Parsing ──────────────────────────────────────────────────────────
+def parse_multipart(content_type: str, body: bytes) -> Tuple[List[Upload], Dict[str, str]]:
+    """Split a multipart/form-data body into file uploads and plain text fields."""
+    msg = BytesParser(policy=HTTP).parsebytes(
+        b"Content-Type: " + content_type.encode("latin-1") + b"\r\n\r\n" + body
+    )
+    if not msg.is_multipart():
+        raise ValueError("expected multipart/form-data body")
+
+    uploads, fields = [], {}
+    for part in msg.iter_parts():
+        payload = part.get_payload(decode=True) or b""
+        file_name = part.get_filename()
+        if file_name:
+            uploads.append((file_name, payload))
+        else:
+            name = part.get_param("name", header="content-disposition")
+            if name:
+                fields[name] = payload.decode("utf-8", errors="replace")
+    return uploads, fields
+
+
+def check_upload(upload: Upload) -> Optional[str]:
+    """Return an error message if the upload can't be a parseable PDF, else None."""
+    file_name, data = upload
+    return check_pdf(file_name, data, MAX_FILE_BYTES)
+
+
+def split_skills(raw: str) -> List[str]:
+    return [s.strip().lower() for s in raw.split(",") if s.strip()]
+
+
+# ─── HTTP Handler ─────────────────────────────────────────────────────────────
+class ResumeRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    pool: ResumeWorkerPool = None  # set by make_server
+
+    def _send_json(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _reject(self, status: int, error: str) -> None:
+        """Reply with an error before the body was read; the unread body must not be
+        parsed as the next keep-alive request, so the connection is closed."""
+        self.close_connection = True
+        self._send_json(status, {"error": error})
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _start_ndjson(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _emit(self, index: int, file_name: str, result: Optional[dict], error: Optional[str]) -> None:
+        line = {"index": index, "file_name": file_name}
+        line.update({"status": "error", "error": error} if error else {"status": "ok", "result": result})
+        self._write_chunk(json.dumps(line, ensure_ascii=False).encode("utf-8") + b"\n")
+
+    def _content_length(self, limit: int) -> Optional[int]:
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            self._reject(400, "malformed Content-Length")
+            return None
+        if length <= 0:
+            self._reject(411, "Content-Length required")
+            return None
+        if length > limit:
+            self._reject(413, f"body larger than {limit} bytes")
+            return None
+        return length
+
+    def _read_body(self) -> Optional[bytes]:
+        length = self._content_length(MAX_BODY_BYTES)
+        return None if length is None else self.rfile.read(length)
+
+    def _spool_body(self) -> Optional[IO[bytes]]:
+        """
+        Copy the body into an anonymous temp file. Not a SpooledTemporaryFile: before
+        Python 3.11 it has no seekable(), which zipfile needs to read members.
+        """
+        length = self._content_length(MAX_ARCHIVE_BYTES)
+        if length is None:
+            return None
+        spool = tempfile.TemporaryFile()
+        while length:
+            chunk = self.rfile.read(min(length, 1 << 16))
+            if not chunk:
+                break
+            spool.write(chunk)
+            length -= len(chunk)
+        spool.seek(0)
+        return spool
+
+    def _read_uploads(self, query: Dict[str, List[str]]) -> Optional[Tuple[List[Upload], str, List[str]]]:
+        body = self._read_body()
+        if body is None:
+            return None
+        content_type = self.headers.get("Content-Type", "")
+        if content_type.startswith("multipart/form-data"):
+            try:
+                uploads, fields = parse_multipart(content_type, body)
+            except ValueError as e:
+                self._send_json(400, {"error": str(e)})
+                return None
+            return uploads, fields.get("jd", ""), split_skills(fields.get("skills", ""))
+        file_name = query.get("file_name", ["resume.pdf"])[0]
+        return [(file_name, body)], "", split_skills(query.get("skills", [""])[0])
+
+    def do_GET(self) -> None:
+        if urlparse(self.path).path != "/health":
+            self._send_json(404, {"error": "not found"})
+            return
+        self._send_json(200, {
+            "status": "ok",
+            "workers": self.pool.workers,
+            "in_flight": self.pool.in_flight,
+            "max_queue": self.pool.max_queue,
+        })
+
+    def do_POST(self) -> None:
+        url = urlparse(self.path)
+        if url.path == "/archive":
+            self._handle_archive(parse_qs(url.query))
+            return
+        if url.path not in ("/parse", "/batch"):
+            self._reject(404, "not found")
+            return
+        parsed = self._read_uploads(parse_qs(url.query))
+        if parsed is None:
+            return
+        uploads, jd_text, skills = parsed
+        if url.path == "/parse":
+            self._handle_parse(uploads, jd_text, skills)
+        else:
+            self._handle_batch(uploads, jd_text, skills)
+
+    def _handle_parse(self, uploads: List[Upload], jd_text: str, skills: List[str]) -> None:
+        if len(uploads) != 1:
+            self._send_json(400, {"error": "/parse takes exactly one file; use /batch for more"})
+            return
+        err = check_upload(uploads[0])
+        if err:
+            self._send_json(400, {"error": err})
+            return
+        try:
+            futures = self.pool.submit_many(uploads, jd_text, skills)
+        except QueueFullError as e:
+            self._send_json(503, {"error": str(e)})
+            return
+        for _, result, error in self.pool.iter_completed(futures):
+            if error:
+                status = 504 if error.startswith("timed out") else 500
+                self._send_json(status, {"file_name": uploads[0][0], "error": error})
+            else:
+                self._send_json(200, result)
+
+    def _handle_batch(self, uploads: List[Upload], jd_text: str, skills: List[str]) -> None:
+        if not uploads:
+            self._send_json(400, {"error": "no files in request"})
+            return
+        if len(uploads) > MAX_BATCH_FILES:
+            self._send_json(413, {"error": f"more than {MAX_BATCH_FILES} files in one batch"})
+            return
+
+        # rejected uploads are reported inline; the rest go to the pool
+        rejected = {i: check_upload(u) for i, u in enumerate(uploads)}
+        accepted = [i for i, err in rejected.items() if err is None]
+        try:
+            futures = self.pool.submit_many([uploads[i] for i in accepted], jd_text, skills)
+        except QueueFullError as e:
+            self._send_json(503, {"error": str(e)})
+            return
+
+        self._start_ndjson()
+        try:
+            for i, err in rejected.items():
+                if err:
+                    self._emit(i, uploads[i][0], None, err)
+            for j, result, error in self.pool.iter_completed(futures):
+                self._emit(accepted[j], uploads[accepted[j]][0], result, error)
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # client went away; drop whatever hasn't started yet
+            for fut in futures:
+                fut.cancel()
+            self.close_connection = True
+
+    def _handle_archive(self, query: Dict[str, List[str]]) -> None:
+        spool = self._spool_body()
+        if spool is None:
+            return
+        with spool:
+            members = iter_archive_pdfs(spool, MAX_FILE_BYTES)
+            try:
+                first = next(members, None)
+            except ARCHIVE_ERRORS as e:
+                self._send_json(400, {"error": f"not a readable ZIP/tar archive: {e}"})
+                return
+            if first is None:
+                self._send_json(400, {"error": "no PDFs in archive"})
+                return
+
+            # member index of each upload handed to the pool, in submission order
+            accepted: List[int] = []
+
+            def feed() -> Iterator[Upload]:
+                member, i = first, 0
+                while member is not None:
+                    name, data, err = member
+                    err = f"{name}: {err}" if err else check_upload((name, data))
+                    if err:
+                        self._emit(i, name, None, err)
+                    else:
+                        accepted.append(i)
+                        yield name, data
+                    member, i = next(members, None), i + 1
+
+            self._start_ndjson()
+            try:
+                skills = split_skills(query.get("skills", [""])[0])
+                jd_text = query.get("jd", [""])[0]
+                for j, file_name, result, error in self.pool.stream(feed(), jd_text, skills):
+                    self._emit(accepted[j], file_name, result, error)
+            except (BrokenPipeError, ConnectionResetError):
+                self.close_connection = True
+                return
+            except Exception as e:
+                # broken archive, full queue, …: headers are already out, so report it
+                # as a final line and still end the chunked body cleanly
+                line = {"status": "error", "error": f"{type(e).__name__}: {e}"}
+                self._write_chunk(json.dumps(line).encode("utf-8") + b"\n")
+            self.wfile.write(b"0\r\n\r\n")
+
+
+def make_server(host: str = HOST, port: int = PORT, pool: Optional[ResumeWorkerPool] = None) -> ThreadingHTTPServer:
+    handler = type("BoundResumeRequestHandler", (ResumeRequestHandler,), {"pool": pool or ResumeWorkerPool()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local HTTP batch-parsing service for resumes.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--max-queue", type=int, default=MAX_QUEUE)
+    parser.add_argument("--budget", type=float, default=RESUME_BUDGET, help="seconds per resume before degrading")
+    parser.add_argument("--fake-llm", action="store_true", help="use the offline fake instead of Gemini")
+    parser.add_argument("--fake-llm-latency", type=float, default=0.0, help="seconds the fake LLM sleeps per call")
+    args = parser.parse_args()
+
+    if args.fake_llm:
+        # read by src.extractor when each worker imports it
+        os.environ["RESUME_PARSER_FAKE_LLM"] = "1"
+        os.environ["RESUME_PARSER_FAKE_LLM_LATENCY"] = str(args.fake_llm_latency)
+
+    pool = ResumeWorkerPool(workers=args.workers, max_queue=args.max_queue, budget=args.budget)
+    print(f"🔥 Warming {args.workers} workers…")
+    pool.warm()
+    server = make_server(args.host, args.port, pool)
+    print(f"✅ Listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()